@@ -1,29 +1,86 @@
 import os
+import mmap
 import hashlib
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+READ_SIZE = 1024 * 1024  # fallback chunk size when mmap is unavailable
+SMALL_TREE_BYTES = 8 * 1024 * 1024  # below this, process startup outweighs hashing
+_BLAKE2B_PROTO = hashlib.blake2b(digest_size=32)  # 256-bit hash; copied per file
 
 def compute_blake2b(filepath):
-    hasher = hashlib.blake2b(digest_size=32)  # 256-bit hash
+    hasher = _BLAKE2B_PROTO.copy()
     with open(filepath, "rb") as f:
-        for chunk in iter(lambda: f.read(4096), b""):
+        # Size 0 is either truly empty (mmap rejects it) or a procfs/sysfs
+        # file whose content only shows up when read, so read those
+        if os.fstat(f.fileno()).st_size > 0:
+            try:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    hasher.update(mm)
+                return hasher.hexdigest()
+            except (OSError, ValueError):
+                # Some filesystems (pipes, network mounts) can't be mapped
+                f.seek(0)
+        for chunk in iter(lambda: f.read(READ_SIZE), b""):
             hasher.update(chunk)
     return hasher.hexdigest()
 
+def _iter_files(root):
+    """Yield DirEntry objects for every non-directory entry below root."""
+    try:
+        entries = os.scandir(root)
+    except OSError as e:
+        print(f"[!] Cannot read directory {root}: {e}")
+        return
+    subdirs = []
+    with entries:
+        for entry in entries:
+            # Like os.walk: symlinked dirs are not descended into, and anything
+            # else (broken symlinks included) is listed so errors get reported
+            try:
+                is_dir = entry.is_dir()
+            except OSError:
+                is_dir = False
+            if not is_dir:
+                yield entry
+            elif not entry.is_symlink():
+                subdirs.append(entry.path)
+    # Also like os.walk: a directory's files come before its subdirectories
+    for path in subdirs:
+        yield from _iter_files(path)
+
 def check_folders_hash(folders=["output", "export"]):
     print(f"{'File Path':<60} | {'BLAKE2b-256 Hash'}")
     print("-" * 100)
 
+    paths = []
+    sizes = {}
     for folder in folders:
         if not os.path.isdir(folder):
             print(f"[!] Folder not found: {folder}")
             continue
-        for root, _, files in os.walk(folder):
-            for name in files:
-                full_path = os.path.join(root, name)
-                try:
-                    hash_value = compute_blake2b(full_path)
-                    print(f"{full_path:<60} | {hash_value}")
-                except Exception as e:
-                    print(f"[Error reading {full_path}]: {e}")
+        for entry in _iter_files(folder):
+            paths.append(entry.path)
+            try:
+                sizes[entry.path] = entry.stat().st_size
+            except OSError:
+                sizes[entry.path] = None  # let compute_blake2b report the error
+
+    # Submit largest first so big files don't straggle at the end. Zero-size
+    # files are hashed too: procfs/sysfs report 0 but still have content
+    pending = sorted(paths, key=lambda p: -(sizes[p] or 0))
+    total_bytes = sum(sizes[p] or 0 for p in pending)
+
+    # Hashing releases the GIL, so threads suffice for small trees
+    executor_cls = ThreadPoolExecutor if total_bytes < SMALL_TREE_BYTES else ProcessPoolExecutor
+    with executor_cls() as executor:
+        futures = {path: executor.submit(compute_blake2b, path) for path in pending}
+        # Print from the main thread, in walk order, so lines never interleave
+        for full_path in paths:
+            try:
+                hash_value = futures[full_path].result()
+                print(f"{full_path:<60} | {hash_value}")
+            except Exception as e:
+                print(f"[Error reading {full_path}]: {e}")
 
 if __name__ == "__main__":
     check_folders_hash()
@@ -1,29 +1,35 @@
 from datetime import datetime
-import uuid
+import secrets
 import os
 
 def generate_recadv():
-    def segment(tag, *elements):
-        return f"{tag}+{'+'.join(elements)}'"
+    buf = bytearray()
+    segment_count = 0
 
-    message = []
+    def emit(tag, *elements):
+        nonlocal segment_count
+        buf.extend(tag.encode())
+        buf.append(0x2B)  # '+'
+        buf.extend("+".join(elements).encode())
+        buf.extend(b"'\n")
+        segment_count += 1
 
     # Message header
-    message_ref = str(uuid.uuid4())[:14].replace('-', '')
-    message.append(segment("UNH", message_ref, "RECADV:D:96A:UN:EAN008"))
+    message_ref = secrets.token_hex(7)
+    emit("UNH", message_ref, "RECADV:D:96A:UN:EAN008")
 
     # Beginning of message
-    message.append(segment("BGM", "351", "RECADV001", "9"))  # 351 = Receiving Advice, 9 = Original
+    emit("BGM", "351", "RECADV001", "9")  # 351 = Receiving Advice, 9 = Original
 
     # Date/time of message
-    message.append(segment("DTM", "137:" + datetime.now().strftime("%Y%m%d:%H%M") + ":203"))
+    emit("DTM", "137:" + datetime.now().strftime("%Y%m%d:%H%M") + ":203")
 
     # Reference to dispatch/delivery note
-    message.append(segment("RFF", "DQ:123456789"))
+    emit("RFF", "DQ:123456789")
 
     # Name and address
-    message.append(segment("NAD", "BY", "5412345000176::9"))  # Buyer
-    message.append(segment("NAD", "SU", "4012345500004::9"))  # Supplier
+    emit("NAD", "BY", "5412345000176::9")  # Buyer
+    emit("NAD", "SU", "4012345500004::9")  # Supplier
 
     # Line items
     line_items = [
@@ -32,19 +38,30 @@ def generate_recadv():
     ]
 
     for item in line_items:
-        message.append(segment("LIN", item["line_no"], "", f"EN:{item['ean']}"))
-        message.append(segment("QTY", "113:" + item["qty"]))
+        emit("LIN", item["line_no"], "", f"EN:{item['ean']}")
+        emit("QTY", "113:" + item["qty"])
 
     # Trailer
-    segment_count = len(message) + 1
-    message.append(segment("UNT", str(segment_count), message_ref))
+    emit("UNT", str(segment_count + 1), message_ref)
 
-    return "\n".join(message)
+    return buf[:-1].decode()  # drop the trailing newline
 
 def export_to_edi_file(content, filename="recadv.edi", directory="."):
     filepath = os.path.join(directory, filename)
-    with open(filepath, "w", encoding="utf-8") as f:
-        f.write(content)
+    if hasattr(os, "posix_fadvise"):
+        data = content.encode("utf-8")
+        fd = os.open(filepath, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o666)  # umask applies, as with open()
+        try:
+            view = memoryview(data)
+            while view:
+                view = view[os.write(fd, view):]
+            # Write-once output: tell the kernel not to keep it in the page cache
+            os.posix_fadvise(fd, 0, len(data), os.POSIX_FADV_DONTNEED)
+        finally:
+            os.close(fd)
+    else:
+        with open(filepath, "w", encoding="utf-8") as f:
+            f.write(content)
     print(f"RECADV message written to: {filepath}")
 
 # Generate and export
@@ -1,38 +1,44 @@
-from datetime import datetime
-import uuid
+import time
+import secrets
 import os
 
 def generate_recadv():
-    def segment(tag, *elements):
-        return f"{tag}+{'+'.join(elements)}'"
+    buf = bytearray()
+    segment_count = 0
 
-    now = datetime.utcnow()
-    timestamp = now.strftime("%y%m%d:%H%M")
-    control_ref = str(uuid.uuid4())[:8].upper()
+    def emit(tag, *elements):
+        nonlocal segment_count
+        buf.extend(tag.encode())
+        buf.append(0x2B)  # '+'
+        buf.extend("+".join(elements).encode())
+        buf.extend(b"'\n")
+        segment_count += 1
 
-    message = []
+    now = time.gmtime()  # one UTC struct_tm shared by UNB and DTM
+    timestamp = time.strftime("%y%m%d:%H%M", now)
+    control_ref = secrets.token_hex(4).upper()
 
     # --- UNB (Interchange header) ---
     sender_id = "SENDERID"       # Replace with actual sender ID
     receiver_id = "RECEIVERID"   # Replace with actual receiver ID
-    message.append(segment("UNB", "UNOA:1", sender_id, receiver_id, timestamp, control_ref))
+    emit("UNB", "UNOA:1", sender_id, receiver_id, timestamp, control_ref)
 
     # --- UNH (Message header) ---
-    message_ref = str(uuid.uuid4())[:14].replace('-', '')
-    message.append(segment("UNH", message_ref, "RECADV:D:96A:UN:EAN008"))
+    message_ref = secrets.token_hex(7)
+    emit("UNH", message_ref, "RECADV:D:96A:UN:EAN008")
 
     # --- BGM (Beginning of message) ---
-    message.append(segment("BGM", "351", "RECADV001", "9"))
+    emit("BGM", "351", "RECADV001", "9")
 
     # --- DTM (Document date/time) ---
-    message.append(segment("DTM", "137:" + now.strftime("%Y%m%d:%H%M") + ":203"))
+    emit("DTM", "137:" + time.strftime("%Y%m%d:%H%M", now) + ":203")
 
     # --- RFF (Delivery note ref) ---
-    message.append(segment("RFF", "DQ:123456789"))
+    emit("RFF", "DQ:123456789")
 
     # --- NAD (Buyer/Supplier) ---
-    message.append(segment("NAD", "BY", "5412345000176::9"))
-    message.append(segment("NAD", "SU", "4012345500004::9"))
+    emit("NAD", "BY", "5412345000176::9")
+    emit("NAD", "SU", "4012345500004::9")
 
     # --- Line items ---
     line_items = [
@@ -41,22 +47,33 @@ def generate_recadv():
     ]
 
     for item in line_items:
-        message.append(segment("LIN", item["line_no"], "", f"EN:{item['ean']}"))
-        message.append(segment("QTY", "113:" + item["qty"]))
+        emit("LIN", item["line_no"], "", f"EN:{item['ean']}")
+        emit("QTY", "113:" + item["qty"])
 
     # --- UNT (Message trailer) ---
-    segment_count = len(message) - 1  # exclude UNB
-    message.append(segment("UNT", str(segment_count), message_ref))
+    emit("UNT", str(segment_count - 1), message_ref)  # exclude UNB
 
     # --- UNZ (Interchange trailer) ---
-    message.append(segment("UNZ", "1", control_ref))
+    emit("UNZ", "1", control_ref)
 
-    return "\n".join(message)
+    return buf[:-1].decode()  # drop the trailing newline
 
 def export_to_edi_file(content, filename="recadv.edi", directory="."):
     filepath = os.path.join(directory, filename)
-    with open(filepath, "w", encoding="utf-8") as f:
-        f.write(content)
+    if hasattr(os, "posix_fadvise"):
+        data = content.encode("utf-8")
+        fd = os.open(filepath, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o666)  # umask applies, as with open()
+        try:
+            view = memoryview(data)
+            while view:
+                view = view[os.write(fd, view):]
+            # Write-once output: tell the kernel not to keep it in the page cache
+            os.posix_fadvise(fd, 0, len(data), os.POSIX_FADV_DONTNEED)
+        finally:
+            os.close(fd)
+    else:
+        with open(filepath, "w", encoding="utf-8") as f:
+            f.write(content)
     print(f"RECADV interchange written to: {filepath}")
 
 # Generate and export
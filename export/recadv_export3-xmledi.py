@@ -1,15 +1,15 @@
-from datetime import datetime
-import uuid
+import time
+import secrets
 import os
-import xml.etree.ElementTree as ET
+from html import escape
 
 def generate_recadv_segments():
     def segment(tag, *elements):
         return f"{tag}+{'+'.join(elements)}'"
 
-    now = datetime.utcnow()
-    timestamp = now.strftime("%y%m%d:%H%M")
-    control_ref = str(uuid.uuid4())[:8].upper()
+    now = time.gmtime()  # one UTC struct_tm shared by UNB and DTM
+    timestamp = time.strftime("%y%m%d:%H%M", now)
+    control_ref = secrets.token_hex(4).upper()
 
     message = []
 
@@ -19,12 +19,12 @@ def generate_recadv_segments():
     message.append(segment("UNB", "UNOA:1", sender_id, receiver_id, timestamp, control_ref))
 
     # --- UNH ---
-    message_ref = str(uuid.uuid4())[:14].replace('-', '')
+    message_ref = secrets.token_hex(7)
     message.append(segment("UNH", message_ref, "RECADV:D:96A:UN:EAN008"))
 
     # --- BGM, DTM, RFF ---
     message.append(segment("BGM", "351", "RECADV001", "9"))
-    message.append(segment("DTM", "137:" + now.strftime("%Y%m%d:%H%M") + ":203"))
+    message.append(segment("DTM", "137:" + time.strftime("%Y%m%d:%H%M", now) + ":203"))
     message.append(segment("RFF", "DQ:123456789"))
     message.append(segment("NAD", "BY", "5412345000176::9"))
     message.append(segment("NAD", "SU", "4012345500004::9"))
@@ -57,23 +57,39 @@ def generate_recadv_segments():
 
 def export_to_edi_file(segments, filename="recadv.edi", directory="."):
     filepath = os.path.join(directory, filename)
-    with open(filepath, "w", encoding="utf-8") as f:
-        f.write("\n".join(segments))
+    if hasattr(os, "posix_fadvise"):
+        data = "\n".join(segments).encode("utf-8")
+        fd = os.open(filepath, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o666)  # umask applies, as with open()
+        try:
+            view = memoryview(data)
+            while view:
+                view = view[os.write(fd, view):]
+            # Write-once output: tell the kernel not to keep it in the page cache
+            os.posix_fadvise(fd, 0, len(data), os.POSIX_FADV_DONTNEED)
+        finally:
+            os.close(fd)
+    else:
+        with open(filepath, "w", encoding="utf-8") as f:
+            f.write("\n".join(segments))
     print(f"RECADV EDIFACT written to: {filepath}")
 
+def _xml_segment(seg):
+    tag, *parts = seg.strip().split("+")
+    if not parts:
+        return f"<{tag} />"
+    elements = "".join(
+        f"<Element{i}>{escape(part, quote=False)}</Element{i}>" if part else f"<Element{i} />"
+        for i, part in enumerate(parts, 1)
+    )
+    return f"<{tag}>{elements}</{tag}>"
+
 def export_to_xml(segments, filename="recadv.xml", directory="."):
-    root = ET.Element("RECADV")
-    for seg in segments:
-        if not seg.strip():
-            continue
-        tag, *parts = seg.strip().split("+")
-        element = ET.SubElement(root, tag)
-        for i, part in enumerate(parts):
-            sub = ET.SubElement(element, f"Element{i+1}")
-            sub.text = part
-    tree = ET.ElementTree(root)
+    # The document is flat (root -> segment -> element), so render it as one
+    # string instead of building an element tree; output matches ElementTree.write()
+    body = "".join(_xml_segment(seg) for seg in segments if seg.strip())
     filepath = os.path.join(directory, filename)
-    tree.write(filepath, encoding="utf-8", xml_declaration=True)
+    with open(filepath, "w", encoding="utf-8") as f:
+        f.write(f"<?xml version='1.0' encoding='utf-8'?>\n<RECADV>{body}</RECADV>")
     print(f"RECADV XML written to: {filepath}")
 
 # Generate and export
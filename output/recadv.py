@@ -1,28 +1,34 @@
 from datetime import datetime
-import uuid
+import secrets
 
 def generate_recadv():
-    def segment(tag, *elements):
-        return f"{tag}+{'+'.join(elements)}'"
+    buf = bytearray()
+    segment_count = 0
 
-    message = []
+    def emit(tag, *elements):
+        nonlocal segment_count
+        buf.extend(tag.encode())
+        buf.append(0x2B)  # '+'
+        buf.extend("+".join(elements).encode())
+        buf.extend(b"'\n")
+        segment_count += 1
 
     # Message header
-    message_ref = str(uuid.uuid4())[:14].replace('-', '')
-    message.append(segment("UNH", message_ref, "RECADV:D:96A:UN:EAN008"))
+    message_ref = secrets.token_hex(7)
+    emit("UNH", message_ref, "RECADV:D:96A:UN:EAN008")
 
     # Beginning of message
-    message.append(segment("BGM", "351", "RECADV001", "9"))  # 351 = Receiving Advice, 9 = Original
+    emit("BGM", "351", "RECADV001", "9")  # 351 = Receiving Advice, 9 = Original
 
     # Date/time of message
-    message.append(segment("DTM", "137:" + datetime.now().strftime("%Y%m%d:%H%M") + ":203"))  # 137 = Document date/time, format 203 = CCYYMMDD:HHMM
+    emit("DTM", "137:" + datetime.now().strftime("%Y%m%d:%H%M") + ":203")  # 137 = Document date/time, format 203 = CCYYMMDD:HHMM
 
     # Reference to dispatch/delivery note
-    message.append(segment("RFF", "DQ:123456789"))  # DQ = Delivery Note Number
+    emit("RFF", "DQ:123456789")  # DQ = Delivery Note Number
 
     # Name and address - buyer and supplier
-    message.append(segment("NAD", "BY", "5412345000176::9"))  # Buyer GLN
-    message.append(segment("NAD", "SU", "4012345500004::9"))  # Supplier GLN
+    emit("NAD", "BY", "5412345000176::9")  # Buyer GLN
+    emit("NAD", "SU", "4012345500004::9")  # Supplier GLN
 
     # Item level (example with two lines)
     line_items = [
@@ -31,14 +37,13 @@ def generate_recadv():
     ]
 
     for item in line_items:
-        message.append(segment("LIN", item["line_no"], "", f"EN:{item['ean']}"))
-        message.append(segment("QTY", "113:" + item["qty"]))  # 113 = Quantity received
+        emit("LIN", item["line_no"], "", f"EN:{item['ean']}")
+        emit("QTY", "113:" + item["qty"])  # 113 = Quantity received
 
     # Message trailer
-    segment_count = len(message) + 1  # +1 for UNT
-    message.append(segment("UNT", str(segment_count), message_ref))
+    emit("UNT", str(segment_count + 1), message_ref)  # +1 for UNT
 
-    return "\n".join(message)
+    return buf[:-1].decode()  # drop the trailing newline
 
 # Usage
 print(generate_recadv())
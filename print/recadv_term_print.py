@@ -1,5 +1,6 @@
 from datetime import datetime
-import uuid
+import functools
+import secrets
 from typing import List, Dict, Any
 
 def edifact_escape(value: str) -> str:
@@ -9,6 +10,11 @@ def edifact_escape(value: str) -> str:
     """
     if not isinstance(value, str):
         return value
+    return _escape_str(value)
+
+@functools.lru_cache(maxsize=4096)
+def _escape_str(value: str) -> str:
+    # Most elements (qualifiers, codes, EANs) repeat across messages, so cache
     return value.replace("'", "?").replace("+", "?").replace(":", "?")
 
 class RecadvGenerator:
@@ -30,11 +36,11 @@ class RecadvGenerator:
         self.delivery_location = delivery_location
         self.reference = reference
 
-    def _generate_message_reference(self) -> str:
+    def _generate_message_reference(self, now: datetime) -> str:
         """
-        Generates a unique message reference using the current timestamp and a UUID.
+        Generates a unique message reference using the given timestamp and a random hex suffix.
         """
-        return datetime.now().strftime("%Y%m%d%H%M") + str(uuid.uuid4().int)[:4]
+        return now.strftime("%Y%m%d%H%M") + secrets.token_hex(2)
 
     def _segment(self, tag: str, *elements: Any) -> str:
         """
@@ -43,34 +49,26 @@ class RecadvGenerator:
         elements_escaped = [edifact_escape(str(e)) if e is not None else "" for e in elements]
         return f"{tag}+{'+'.join(elements_escaped)}'"
 
-    def add_una_segment(self, message: List[str]) -> None:
+    def _render_skeleton(self, message_ref: str, now: datetime) -> str:
         """
-        Adds the UNA service string advice segment.
+        Renders the fixed part of the message (UNA through LOC) in one pass.
         """
-        message.append("UNA:+.? '")
+        def esc(value: Any) -> str:
+            # Same element rule as _segment: None is empty, anything else str()'d
+            return edifact_escape(str(value)) if value is not None else ""
 
-    def add_header(self, message: List[str], message_ref: str) -> None:
-        """
-        Adds header segments (UNH, BGM, DTM, RFF).
-        """
-        message.append(self._segment("UNH", message_ref, "RECADV:D:96A:UN:EAN008"))
-        message.append(self._segment("BGM", "351", "RECADV001", "9"))
-        message.append(self._segment("DTM", f"137:{datetime.now().strftime('%Y%m%d:%H%M')}:203"))
-        message.append(self._segment("RFF", self.reference))
-
-    def add_parties(self, message: List[str]) -> None:
-        """
-        Adds party segments (NAD).
-        """
-        message.append(self._segment("NAD", "BY", self.buyer_code))
-        message.append(self._segment("NAD", "SU", self.supplier_code))
-
-    def add_transport_details(self, message: List[str]) -> None:
-        """
-        Adds transport details (TDT, LOC).
-        """
-        message.append(self._segment("TDT", "20", "", "", "31", "", self.carrier))
-        message.append(self._segment("LOC", "9", self.delivery_location))
+        timestamp = now.strftime('%Y%m%d:%H%M')
+        return (
+            "UNA:+.? '\n"
+            f"UNH+{esc(message_ref)}+RECADV?D?96A?UN?EAN008'\n"
+            "BGM+351+RECADV001+9'\n"
+            f"DTM+{esc(f'137:{timestamp}:203')}'\n"
+            f"RFF+{esc(self.reference)}'\n"
+            f"NAD+BY+{esc(self.buyer_code)}'\n"
+            f"NAD+SU+{esc(self.supplier_code)}'\n"
+            f"TDT+20+++31++{esc(self.carrier)}'\n"
+            f"LOC+9+{esc(self.delivery_location)}'"
+        )
 
     def add_line_items(self, message: List[str], line_items: List[Dict[str, str]]) -> None:
         """
@@ -92,17 +90,16 @@ class RecadvGenerator:
         """
         Generates the full RECADV message as a string.
         """
+        now = datetime.now()
+        message_ref = self._generate_message_reference(now)
+        skeleton = self._render_skeleton(message_ref, now)
         message: List[str] = []
-        message_ref = self._generate_message_reference()
-        self.add_una_segment(message)
-        self.add_header(message, message_ref)
-        self.add_parties(message)
-        self.add_transport_details(message)
         self.add_line_items(message, line_items)
-        # UNT segment count: all segments except UNA
-        segment_count = len(message)  # If UNA is counted, use len(message), else len(message) - 1
+        # UNT segment count: UNH..LOC (8 segments), the line item segments and
+        # UNT itself; UNA is a service segment outside the count
+        segment_count = 8 + len(message) + 1
         self.add_trailer(message, segment_count, message_ref)
-        return "\n".join(message)
+        return skeleton + "\n" + "\n".join(message)
 
 # Usage Example
 if __name__ == "__main__":